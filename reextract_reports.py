@@ -0,0 +1,204 @@
+"""
+Retraitement hors ligne des rapports à partir du texte archivé.
+
+Parcourt db.reports par lots, relance l'extraction JSON via le LLM en
+parallèle (avec un plafond de requêtes par seconde), et enregistre la
+progression dans un fichier de checkpoint pour pouvoir reprendre.
+
+Usage :
+    python reextract_reports.py --workers 4 --rate 2 --chunk-size 100
+    python reextract_reports.py --retry-failed
+"""
+import argparse, json, os, threading, time
+from concurrent.futures import ThreadPoolExecutor
+
+from repositorys.report_repository import (
+    get_reports_to_reextract_repository,
+    get_reports_by_ids_to_reextract_repository,
+    decompress_text_repository,
+)
+from services.report_service import EXTRACTION_VERSION, reextract_report_service
+
+
+class RateLimiter:
+    """
+    Limite le nombre d'appels au LLM par seconde (partagé entre les threads)
+    """
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.next_call = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self) -> None:
+        with self.lock:
+            now = time.monotonic()
+            delay = self.next_call - now
+            self.next_call = max(now, self.next_call) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+def load_checkpoint(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as checkpoint_file:
+        checkpoint = json.load(checkpoint_file)
+    # un checkpoint d'une autre version du prompt n'est pas réutilisable
+    if checkpoint.get("extraction_version") != EXTRACTION_VERSION:
+        return {}
+    return checkpoint
+
+
+def save_checkpoint(path: str, checkpoint: dict) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as checkpoint_file:
+        json.dump(checkpoint, checkpoint_file, indent=2)
+    os.replace(tmp_path, path)
+
+
+def reextract_one(report: dict, limiter: RateLimiter, timeout: float | None = None) -> tuple[str, str | None]:
+    try:
+        extracted_text = decompress_text_repository(report["extracted_text_compressed"])
+        limiter.wait()
+        reextract_report_service(report_id=report["_id"], extracted_text=extracted_text, timeout=timeout)
+        return report["_id"], None
+    except Exception as error:
+        return report["_id"], str(error)
+
+
+def reextract_batch(executor: ThreadPoolExecutor, reports: list[dict], limiter: RateLimiter, timeout: float | None) -> list[str]:
+    failed_ids = []
+    for report_id, error in executor.map(lambda report: reextract_one(report, limiter, timeout), reports):
+        if error:
+            failed_ids.append(report_id)
+            print(f"[ECHEC] {report_id}: {error}")
+    return failed_ids
+
+
+def run(
+    chunk_size: int,
+    workers: int,
+    rate: float,
+    checkpoint_path: str,
+    limit: int | None,
+    timeout: float | None = None
+) -> int:
+    checkpoint = load_checkpoint(checkpoint_path)
+    last_id = checkpoint.get("last_id")
+    processed = checkpoint.get("processed", 0)
+    failed_ids = checkpoint.get("failed_ids", [])
+    limiter = RateLimiter(rate)
+    # --limit borne cette exécution, pas le total cumulé du checkpoint
+    processed_this_run = 0
+
+    print(f"Version d'extraction cible : {EXTRACTION_VERSION} (reprise après {last_id or 'début'})")
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while limit is None or processed_this_run < limit:
+            batch_size = chunk_size if limit is None else min(chunk_size, limit - processed_this_run)
+            reports = get_reports_to_reextract_repository(
+                after_id=last_id,
+                extraction_version=EXTRACTION_VERSION,
+                limit=batch_size
+            )
+            if not reports:
+                break
+
+            failed_ids += reextract_batch(executor, reports, limiter, timeout)
+
+            # les lots sont triés par _id : le dernier du lot borne la reprise
+            last_id = reports[-1]["_id"]
+            processed += len(reports)
+            processed_this_run += len(reports)
+            save_checkpoint(checkpoint_path, {
+                "extraction_version": EXTRACTION_VERSION,
+                "last_id": last_id,
+                "processed": processed,
+                "failed_ids": failed_ids,
+            })
+            print(f"{processed_this_run} rapports traités ({len(failed_ids)} échecs)")
+
+    print(f"Terminé : {processed_this_run} rapports traités ({processed} au total), {len(failed_ids)} échecs")
+    return processed_this_run
+
+
+def retry_failed(
+    chunk_size: int,
+    workers: int,
+    rate: float,
+    checkpoint_path: str,
+    limit: int | None,
+    timeout: float | None = None
+) -> int:
+    """
+    Retraite les rapports en échec du checkpoint sans déplacer le point de reprise
+    """
+    checkpoint = load_checkpoint(checkpoint_path)
+    pending_ids = checkpoint.get("failed_ids", [])
+    if limit is not None:
+        pending_ids, skipped_ids = pending_ids[:limit], pending_ids[limit:]
+    else:
+        skipped_ids = []
+    limiter = RateLimiter(rate)
+    still_failed_ids = []
+    processed_this_run = 0
+
+    print(f"Nouvelle tentative pour {len(pending_ids)} rapports en échec")
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for start in range(0, len(pending_ids), chunk_size):
+            chunk_ids = pending_ids[start:start + chunk_size]
+            # les rapports absents sont déjà à jour (ou supprimés) : ils sortent de la liste
+            reports = get_reports_by_ids_to_reextract_repository(chunk_ids, extraction_version=EXTRACTION_VERSION)
+            still_failed_ids += reextract_batch(executor, reports, limiter, timeout)
+            processed_this_run += len(reports)
+
+            remaining_ids = still_failed_ids + pending_ids[start + chunk_size:] + skipped_ids
+            save_checkpoint(checkpoint_path, {**checkpoint, "failed_ids": remaining_ids})
+
+    print(f"Terminé : {processed_this_run - len(still_failed_ids)} rapports rattrapés, {len(still_failed_ids)} toujours en échec")
+    return processed_this_run
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Retraite l'extraction JSON des rapports archivés")
+    parser.add_argument("--chunk-size", type=int, default=100, help="taille des lots lus en base")
+    parser.add_argument("--workers", type=int, default=4, help="appels LLM concurrents")
+    parser.add_argument("--rate", type=float, default=2.0, help="appels LLM maximum par seconde (0 = illimité)")
+    parser.add_argument("--checkpoint", default="reextract_checkpoint.json", help="fichier de progression")
+    parser.add_argument("--limit", type=int, default=None, help="nombre maximum de rapports à traiter")
+    parser.add_argument("--timeout", type=float, default=None, help="délai maximum d'un appel LLM en secondes (défaut : LLM_TIMEOUT_SECONDS)")
+    parser.add_argument("--retry-failed", action="store_true", help="retraite uniquement les rapports en échec du checkpoint")
+    parser.add_argument("--reset", action="store_true", help="ignore le checkpoint existant")
+    args = parser.parse_args()
+
+    if args.chunk_size < 1:
+        parser.error("--chunk-size doit être supérieur ou égal à 1")
+    if args.workers < 1:
+        parser.error("--workers doit être supérieur ou égal à 1")
+    if args.limit is not None and args.limit < 1:
+        parser.error("--limit doit être supérieur ou égal à 1")
+    if args.rate < 0:
+        parser.error("--rate doit être positif (0 = illimité)")
+    if args.timeout is not None and args.timeout <= 0:
+        parser.error("--timeout doit être strictement positif")
+
+    if args.reset and args.retry_failed:
+        parser.error("--reset et --retry-failed sont incompatibles")
+
+    if args.reset and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+
+    command = retry_failed if args.retry_failed else run
+    command(
+        chunk_size=args.chunk_size,
+        workers=args.workers,
+        rate=args.rate,
+        checkpoint_path=args.checkpoint,
+        limit=args.limit,
+        timeout=args.timeout,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,46 @@
+import zlib
 from core.connection import db
 from datetime import datetime
+from bson.binary import Binary
 from bson.objectid import ObjectId
 
-def save_report_repository(user_id: str, filename: str, extracted_data: dict = None):
+# Nombre maximum d'anciennes extractions conservées par rapport
+EXTRACTION_HISTORY_LIMIT = 5
+
+def compress_text_repository(text: str) -> Binary:
+    """
+    Compresse le texte extrait (zlib) pour le stockage en base
     """
-    Enregistre un rapport en base de données (sans stocker le texte brut)
+    return Binary(zlib.compress(text.encode("utf-8"), 9))
+
+def decompress_text_repository(data: bytes) -> str:
+    """
+    Décompresse le texte extrait stocké en base
+    """
+    return zlib.decompress(bytes(data)).decode("utf-8")
+
+def save_report_repository(
+    user_id: str,
+    filename: str,
+    extracted_data: dict = None,
+    extracted_text: str = None,
+    extraction_version: int = None
+):
+    """
+    Enregistre un rapport en base de données (texte extrait stocké compressé)
     """
     try:
-        result = db.reports.insert_one({
+        report = {
             "user_id": user_id,
             "filename": filename,
             "extracted_data": extracted_data,
+            "extraction_version": extraction_version,
             "created_at": datetime.now()
-        })
+        }
+        if extracted_text:
+            report["extracted_text_compressed"] = compress_text_repository(extracted_text)
+
+        result = db.reports.insert_one(report)
         return str(result.inserted_id)
     except Exception as e:
         raise ValueError(f"Erreur lors de la sauvegarde du rapport: {str(e)}")
@@ -22,7 +50,10 @@ def get_user_reports_repository(user_id: str):
     Récupère tous les rapports d'un utilisateur
     """
     try:
-        reports = list(db.reports.find({"user_id": user_id}))
+        reports = list(db.reports.find(
+            {"user_id": user_id},
+            {"extracted_text_compressed": 0, "extraction_history": 0}
+        ))
         for report in reports:
             report["_id"] = str(report["_id"])
         return reports
@@ -34,9 +65,101 @@ def get_report_by_id_repository(report_id: str):
     Récupère un rapport spécifique par ID
     """
     try:
-        report = db.reports.find_one({"_id": ObjectId(report_id)})
+        report = db.reports.find_one(
+            {"_id": ObjectId(report_id)},
+            {"extracted_text_compressed": 0, "extraction_history": 0}
+        )
         if report:
             report["_id"] = str(report["_id"])
         return report
     except Exception as e:
-        raise ValueError(f"Erreur lors de la récupération du rapport: {str(e)}")
\ No newline at end of file
+        raise ValueError(f"Erreur lors de la récupération du rapport: {str(e)}")
+
+def get_reports_to_reextract_repository(after_id: str = None, extraction_version: int = None, limit: int = 100):
+    """
+    Récupère un lot de rapports (triés par _id) dont le texte est archivé
+    et dont la version d'extraction diffère de extraction_version.
+    Le texte est renvoyé compressé : la décompression se fait rapport par rapport
+    """
+    try:
+        query = {"extracted_text_compressed": {"$exists": True}}
+        if after_id:
+            query["_id"] = {"$gt": ObjectId(after_id)}
+        if extraction_version is not None:
+            query["extraction_version"] = {"$ne": extraction_version}
+
+        reports = list(
+            db.reports.find(query, {"extracted_text_compressed": 1, "extraction_version": 1})
+            .sort("_id", 1)
+            .limit(limit)
+        )
+        for report in reports:
+            report["_id"] = str(report["_id"])
+        return reports
+    except Exception as e:
+        raise ValueError(f"Erreur lors de la récupération des rapports: {str(e)}")
+
+def get_reports_by_ids_to_reextract_repository(report_ids: list[str], extraction_version: int = None):
+    """
+    Récupère les rapports listés (texte archivé compressé) qui restent à retraiter
+    """
+    try:
+        query = {
+            "_id": {"$in": [ObjectId(report_id) for report_id in report_ids]},
+            "extracted_text_compressed": {"$exists": True}
+        }
+        if extraction_version is not None:
+            query["extraction_version"] = {"$ne": extraction_version}
+
+        reports = list(
+            db.reports.find(query, {"extracted_text_compressed": 1, "extraction_version": 1})
+            .sort("_id", 1)
+        )
+        for report in reports:
+            report["_id"] = str(report["_id"])
+        return reports
+    except Exception as e:
+        raise ValueError(f"Erreur lors de la récupération des rapports: {str(e)}")
+
+def update_report_extraction_repository(report_id: str, extracted_data: dict, extraction_version: int):
+    """
+    Remplace l'extraction d'un rapport et historise la version précédente
+    """
+    try:
+        report = db.reports.find_one(
+            {"_id": ObjectId(report_id)},
+            {"extracted_data": 1, "extraction_version": 1}
+        )
+        if not report:
+            raise ValueError("Rapport non trouvé")
+
+        update = {
+            "$set": {
+                "extracted_data": extracted_data,
+                "extraction_version": extraction_version,
+                "updated_at": datetime.now()
+            }
+        }
+        if report.get("extracted_data") is not None:
+            update["$push"] = {
+                "extraction_history": {
+                    "$each": [{
+                        "extracted_data": report.get("extracted_data"),
+                        "extraction_version": report.get("extraction_version"),
+                        "archived_at": datetime.now()
+                    }],
+                    "$slice": -EXTRACTION_HISTORY_LIMIT
+                }
+            }
+
+        # compare-and-set : échoue si l'extraction a changé depuis la lecture
+        result = db.reports.update_one(
+            {"_id": ObjectId(report_id), "extraction_version": report.get("extraction_version")},
+            update
+        )
+        if result.matched_count == 0:
+            raise ValueError("Conflit: le rapport a été modifié pendant le retraitement")
+    except ValueError:
+        raise
+    except Exception as e:
+        raise ValueError(f"Erreur lors de la mise à jour du rapport: {str(e)}")
@@ -3,21 +3,36 @@ from io import BytesIO
 from typing import BinaryIO
 from fastapi import UploadFile
 from PyPDF2 import PdfReader
+from core.config import settings
 from repositorys.report_repository import (
     save_report_repository,
     get_report_by_id_repository,
     get_user_reports_repository,
+    update_report_extraction_repository,
 )
 
-def request_mistral_service(prompt):
-    res = requests.post(
-        "http://localhost:11434/api/generate",
-        json={
-            "model": "mistral",
-            "prompt": prompt,
-            "stream": False
-        }
-    )
+# À incrémenter à chaque modification du prompt d'extraction : les rapports
+# d'une version antérieure seront retraités par reextract_reports.py
+EXTRACTION_VERSION = 1
+
+def request_mistral_service(prompt, timeout: float | None = None):
+    try:
+        res = requests.post(
+            "http://localhost:11434/api/generate",
+            json={
+                "model": "mistral",
+                "prompt": prompt,
+                "stream": False
+            },
+            timeout=timeout if timeout is not None else settings.LLM_TIMEOUT_SECONDS
+        )
+        res.raise_for_status()
+    except requests.Timeout:
+        raise ValueError("Le service d'analyse n'a pas répondu à temps")
+    except requests.HTTPError as e:
+        raise ValueError(f"Erreur du service d'analyse (HTTP {e.response.status_code})")
+    except requests.ConnectionError:
+        raise ValueError("Le service d'analyse est injoignable")
     return res.json()["response"]
 
 def validate_pdf_upload_service(file: UploadFile) -> None:
@@ -78,7 +93,7 @@ def classify_medical_report_service(text: str) -> dict:
     return {"is_medical_report": is_medical_report}
 
 
-def extract_medical_report_json_service(text: str) -> dict:
+def extract_medical_report_json_service(text: str, timeout: float | None = None) -> dict:
     if not text or not text.strip():
         raise ValueError("Text is required")
 
@@ -108,7 +123,7 @@ IMPORTANT:
 - Valider que le JSON est bien structuré"""
 
     full_prompt = f"{analysis_prompt}\n\nTexte du rapport à analyser:\n{text}"
-    response = request_mistral_service(full_prompt).strip()
+    response = request_mistral_service(full_prompt, timeout=timeout).strip()
 
     try:
         parsed = json.loads(response)
@@ -140,7 +155,9 @@ async def process_pdf_report(file: UploadFile, user_id: str) -> dict:
     document_id = save_report_repository(
         user_id=user_id,
         filename=file.filename,
-        extracted_data=extracted_json
+        extracted_data=extracted_json,
+        extracted_text=extracted_text,
+        extraction_version=EXTRACTION_VERSION
     )
 
     return {
@@ -163,4 +180,11 @@ def get_user_reports_service(user_id: str) -> list[dict]:
     return get_user_reports_repository(user_id)
 
 
-
+def reextract_report_service(report_id: str, extracted_text: str, timeout: float | None = None) -> dict:
+    extracted_json = extract_medical_report_json_service(extracted_text, timeout=timeout)
+    update_report_extraction_repository(
+        report_id=report_id,
+        extracted_data=extracted_json,
+        extraction_version=EXTRACTION_VERSION
+    )
+    return extracted_json
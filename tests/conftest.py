@@ -0,0 +1,11 @@
+import os, sys
+
+# Variables minimales pour importer core.config / core.connection sans .env
+# (MongoClient ne se connecte qu'à la première requête)
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+os.environ.setdefault("DATABASE_NAME", "pfa_test")
+os.environ.setdefault("JWT_SECRET", "test-secret")
+os.environ.setdefault("JWT_ALGORITHM", "HS256")
+os.environ.setdefault("CORS_ORIGINS", "http://localhost:3000")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
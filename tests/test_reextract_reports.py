@@ -0,0 +1,200 @@
+import json
+import pytest
+
+pytest.importorskip("pymongo")
+pytest.importorskip("fastapi")
+pytest.importorskip("PyPDF2")
+
+import reextract_reports
+from repositorys.report_repository import compress_text_repository
+
+
+def make_reports(count: int) -> list[dict]:
+    return [
+        {
+            "_id": f"{index:024x}",
+            "extracted_text_compressed": compress_text_repository(f"rapport {index}"),
+            "extraction_version": reextract_reports.EXTRACTION_VERSION - 1,
+        }
+        for index in range(1, count + 1)
+    ]
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    """
+    Remplace l'accès base et le LLM : les rapports retraités passent à la version courante
+    """
+    reports = make_reports(7)
+    state = {"reports": reports, "reextracted": [], "failing": set()}
+
+    def get_reports_to_reextract(after_id=None, extraction_version=None, limit=100):
+        pending = [
+            report for report in state["reports"]
+            if (after_id is None or report["_id"] > after_id) and report["extraction_version"] != extraction_version
+        ]
+        return pending[:limit]
+
+    def get_reports_by_ids(report_ids, extraction_version=None):
+        return [
+            report for report in state["reports"]
+            if report["_id"] in report_ids and report["extraction_version"] != extraction_version
+        ]
+
+    def reextract(report_id, extracted_text, timeout=None):
+        if report_id in state["failing"]:
+            raise ValueError("LLM indisponible")
+        state["reextracted"].append(report_id)
+        report = next(report for report in state["reports"] if report["_id"] == report_id)
+        report["extraction_version"] = reextract_reports.EXTRACTION_VERSION
+        return {"texte": extracted_text}
+
+    monkeypatch.setattr(reextract_reports, "get_reports_to_reextract_repository", get_reports_to_reextract)
+    monkeypatch.setattr(reextract_reports, "get_reports_by_ids_to_reextract_repository", get_reports_by_ids)
+    monkeypatch.setattr(reextract_reports, "reextract_report_service", reextract)
+    return state
+
+
+def run_options(checkpoint_path, **overrides) -> dict:
+    options = {"chunk_size": 3, "workers": 2, "rate": 0, "checkpoint_path": str(checkpoint_path), "limit": None}
+    options.update(overrides)
+    return options
+
+
+def test_rate_limiter_spaces_calls(monkeypatch):
+    clock = {"now": 100.0}
+    sleeps = []
+
+    def fake_sleep(delay):
+        sleeps.append(delay)
+        clock["now"] += delay
+
+    monkeypatch.setattr(reextract_reports.time, "monotonic", lambda: clock["now"])
+    monkeypatch.setattr(reextract_reports.time, "sleep", fake_sleep)
+
+    limiter = reextract_reports.RateLimiter(rate=4)
+    for _ in range(3):
+        limiter.wait()
+
+    assert sleeps == [pytest.approx(0.25), pytest.approx(0.25)]
+
+
+def test_rate_limiter_zero_rate_never_sleeps(monkeypatch):
+    monkeypatch.setattr(reextract_reports.time, "sleep", lambda delay: pytest.fail("sleep inattendu"))
+
+    limiter = reextract_reports.RateLimiter(rate=0)
+    for _ in range(5):
+        limiter.wait()
+
+
+def test_load_checkpoint_rejects_other_version(tmp_path):
+    checkpoint_path = tmp_path / "checkpoint.json"
+    checkpoint_path.write_text(json.dumps({
+        "extraction_version": reextract_reports.EXTRACTION_VERSION - 1,
+        "last_id": "0" * 24,
+    }))
+
+    assert reextract_reports.load_checkpoint(str(checkpoint_path)) == {}
+
+
+def test_load_checkpoint_missing_file(tmp_path):
+    assert reextract_reports.load_checkpoint(str(tmp_path / "absent.json")) == {}
+
+
+def test_run_processes_everything_and_checkpoints(fake_db, tmp_path):
+    checkpoint_path = tmp_path / "checkpoint.json"
+
+    processed = reextract_reports.run(**run_options(checkpoint_path))
+
+    checkpoint = json.loads(checkpoint_path.read_text())
+    assert processed == 7
+    assert fake_db["reextracted"] == [report["_id"] for report in fake_db["reports"]]
+    assert checkpoint["last_id"] == fake_db["reports"][-1]["_id"]
+    assert checkpoint["processed"] == 7
+    assert checkpoint["extraction_version"] == reextract_reports.EXTRACTION_VERSION
+
+
+def test_run_limit_applies_per_run(fake_db, tmp_path):
+    checkpoint_path = tmp_path / "checkpoint.json"
+
+    first = reextract_reports.run(**run_options(checkpoint_path, limit=4))
+    second = reextract_reports.run(**run_options(checkpoint_path, limit=4))
+
+    checkpoint = json.loads(checkpoint_path.read_text())
+    assert (first, second) == (4, 3)
+    assert len(fake_db["reextracted"]) == 7
+    assert checkpoint["processed"] == 7
+
+
+def test_run_resumes_after_checkpoint(fake_db, tmp_path):
+    checkpoint_path = tmp_path / "checkpoint.json"
+    reextract_reports.save_checkpoint(str(checkpoint_path), {
+        "extraction_version": reextract_reports.EXTRACTION_VERSION,
+        "last_id": fake_db["reports"][4]["_id"],
+        "processed": 5,
+        "failed_ids": [],
+    })
+
+    processed = reextract_reports.run(**run_options(checkpoint_path))
+
+    assert processed == 2
+    assert fake_db["reextracted"] == [report["_id"] for report in fake_db["reports"][5:]]
+    assert json.loads(checkpoint_path.read_text())["processed"] == 7
+
+
+def test_run_records_corrupt_blob_as_failure(fake_db, tmp_path):
+    checkpoint_path = tmp_path / "checkpoint.json"
+    corrupt_id = fake_db["reports"][1]["_id"]
+    fake_db["reports"][1]["extracted_text_compressed"] = b"corrompu"
+
+    processed = reextract_reports.run(**run_options(checkpoint_path))
+
+    checkpoint = json.loads(checkpoint_path.read_text())
+    assert processed == 7
+    assert checkpoint["failed_ids"] == [corrupt_id]
+    assert corrupt_id not in fake_db["reextracted"]
+
+
+def test_retry_failed_keeps_only_still_failing(fake_db, tmp_path):
+    checkpoint_path = tmp_path / "checkpoint.json"
+    first_id, second_id = fake_db["reports"][0]["_id"], fake_db["reports"][3]["_id"]
+    fake_db["failing"] = {first_id, second_id}
+    reextract_reports.run(**run_options(checkpoint_path))
+    last_id = json.loads(checkpoint_path.read_text())["last_id"]
+
+    fake_db["failing"] = {second_id}
+    processed = reextract_reports.retry_failed(**run_options(checkpoint_path))
+
+    checkpoint = json.loads(checkpoint_path.read_text())
+    assert processed == 2
+    assert first_id in fake_db["reextracted"]
+    assert checkpoint["failed_ids"] == [second_id]
+    assert checkpoint["last_id"] == last_id
+
+
+def test_retry_failed_counts_only_refetched_reports(fake_db, tmp_path):
+    checkpoint_path = tmp_path / "checkpoint.json"
+    done_id, failing_id = fake_db["reports"][0]["_id"], fake_db["reports"][1]["_id"]
+    fake_db["reports"][0]["extraction_version"] = reextract_reports.EXTRACTION_VERSION
+    reextract_reports.save_checkpoint(str(checkpoint_path), {
+        "extraction_version": reextract_reports.EXTRACTION_VERSION,
+        "last_id": fake_db["reports"][-1]["_id"],
+        "processed": 7,
+        "failed_ids": [done_id, failing_id, "f" * 24],
+    })
+
+    processed = reextract_reports.retry_failed(**run_options(checkpoint_path))
+
+    assert processed == 1
+    assert json.loads(checkpoint_path.read_text())["failed_ids"] == []
+
+
+def test_run_skips_reports_at_current_version(fake_db, tmp_path):
+    checkpoint_path = tmp_path / "checkpoint.json"
+    for report in fake_db["reports"][::2]:
+        report["extraction_version"] = reextract_reports.EXTRACTION_VERSION
+
+    processed = reextract_reports.run(**run_options(checkpoint_path))
+
+    assert processed == 3
+    assert fake_db["reextracted"] == [report["_id"] for report in fake_db["reports"][1::2]]
@@ -0,0 +1,193 @@
+import zlib
+import pytest
+
+pytest.importorskip("pymongo")
+
+from types import SimpleNamespace
+from bson.binary import Binary
+from bson.objectid import ObjectId
+from repositorys import report_repository
+from repositorys.report_repository import (
+    EXTRACTION_HISTORY_LIMIT,
+    compress_text_repository,
+    decompress_text_repository,
+    get_report_by_id_repository,
+    get_reports_to_reextract_repository,
+    get_user_reports_repository,
+    save_report_repository,
+    update_report_extraction_repository,
+)
+
+
+class FakeCursor(list):
+    def __init__(self, documents, calls):
+        super().__init__(documents)
+        self.calls = calls
+
+    def sort(self, key, direction):
+        self.calls.append(("sort", key, direction))
+        return self
+
+    def limit(self, count):
+        self.calls.append(("limit", count))
+        return self
+
+
+class FakeReports:
+    """
+    Collection factice qui enregistre les documents envoyés à Mongo
+    """
+    def __init__(self, documents=None, found=None, matched_count=1):
+        self.documents = documents or []
+        self.found = found
+        self.matched_count = matched_count
+        self.calls = []
+
+    def insert_one(self, document):
+        self.calls.append(("insert_one", document))
+        return SimpleNamespace(inserted_id=ObjectId())
+
+    def find(self, query, projection=None):
+        self.calls.append(("find", query, projection))
+        return FakeCursor([dict(document) for document in self.documents], self.calls)
+
+    def find_one(self, query, projection=None):
+        self.calls.append(("find_one", query, projection))
+        return dict(self.found) if self.found else None
+
+    def update_one(self, query, update):
+        self.calls.append(("update_one", query, update))
+        return SimpleNamespace(matched_count=self.matched_count)
+
+
+@pytest.fixture
+def fake_reports(monkeypatch):
+    def install(**kwargs):
+        reports = FakeReports(**kwargs)
+        monkeypatch.setattr(report_repository, "db", SimpleNamespace(reports=reports))
+        return reports
+    return install
+
+
+def calls_named(reports, name):
+    return [call for call in reports.calls if call[0] == name]
+
+
+def test_compress_decompress_round_trip():
+    text = "Compte rendu : patient de 54 ans, fièvre à 39°C.\n" * 50
+
+    compressed = compress_text_repository(text)
+
+    assert len(compressed) < len(text.encode("utf-8"))
+    assert decompress_text_repository(compressed) == text
+
+
+def test_decompress_corrupt_blob_raises():
+    with pytest.raises(zlib.error):
+        decompress_text_repository(b"pas du zlib")
+
+
+def test_save_report_stores_compressed_text_and_version(fake_reports):
+    reports = fake_reports()
+
+    save_report_repository("u1", "rapport.pdf", {"diagnostic": []}, extracted_text="texte", extraction_version=3)
+
+    [(_, document)] = calls_named(reports, "insert_one")
+    assert isinstance(document["extracted_text_compressed"], Binary)
+    assert decompress_text_repository(document["extracted_text_compressed"]) == "texte"
+    assert document["extraction_version"] == 3
+    assert "extracted_text" not in document
+
+
+def test_save_report_without_text_has_no_blob(fake_reports):
+    reports = fake_reports()
+
+    save_report_repository("u1", "rapport.pdf", {})
+
+    [(_, document)] = calls_named(reports, "insert_one")
+    assert "extracted_text_compressed" not in document
+
+
+def test_user_reads_hide_archive_fields(fake_reports):
+    report_id = ObjectId()
+    reports = fake_reports(documents=[{"_id": report_id}], found={"_id": report_id})
+
+    get_user_reports_repository("u1")
+    get_report_by_id_repository(str(report_id))
+
+    [(_, _, find_projection)] = calls_named(reports, "find")
+    [(_, _, find_one_projection)] = calls_named(reports, "find_one")
+    for projection in (find_projection, find_one_projection):
+        assert projection == {"extracted_text_compressed": 0, "extraction_history": 0}
+
+
+def test_reports_to_reextract_query(fake_reports):
+    after_id = ObjectId()
+    blob = compress_text_repository("texte")
+    reports = fake_reports(documents=[{"_id": ObjectId(), "extracted_text_compressed": blob}])
+
+    result = get_reports_to_reextract_repository(after_id=str(after_id), extraction_version=2, limit=10)
+
+    [(_, query, _)] = calls_named(reports, "find")
+    assert query == {
+        "extracted_text_compressed": {"$exists": True},
+        "_id": {"$gt": after_id},
+        "extraction_version": {"$ne": 2},
+    }
+    assert ("sort", "_id", 1) in reports.calls
+    assert ("limit", 10) in reports.calls
+    assert isinstance(result[0]["_id"], str)
+    assert result[0]["extracted_text_compressed"] == blob
+
+
+def test_reports_to_reextract_query_from_start(fake_reports):
+    reports = fake_reports()
+
+    get_reports_to_reextract_repository(extraction_version=2)
+
+    [(_, query, _)] = calls_named(reports, "find")
+    assert "_id" not in query
+
+
+def test_update_extraction_is_compare_and_set(fake_reports):
+    report_id = ObjectId()
+    reports = fake_reports(found={"_id": report_id, "extracted_data": {"ancien": True}, "extraction_version": 1})
+
+    update_report_extraction_repository(str(report_id), {"nouveau": True}, 2)
+
+    [(_, query, update)] = calls_named(reports, "update_one")
+    assert query == {"_id": report_id, "extraction_version": 1}
+    assert update["$set"]["extracted_data"] == {"nouveau": True}
+    assert update["$set"]["extraction_version"] == 2
+    history = update["$push"]["extraction_history"]
+    assert history["$slice"] == -EXTRACTION_HISTORY_LIMIT
+    assert [entry["extracted_data"] for entry in history["$each"]] == [{"ancien": True}]
+    assert history["$each"][0]["extraction_version"] == 1
+
+
+def test_update_extraction_without_previous_data_skips_history(fake_reports):
+    report_id = ObjectId()
+    reports = fake_reports(found={"_id": report_id, "extracted_data": None})
+
+    update_report_extraction_repository(str(report_id), {"nouveau": True}, 2)
+
+    [(_, query, update)] = calls_named(reports, "update_one")
+    assert query == {"_id": report_id, "extraction_version": None}
+    assert "$push" not in update
+
+
+def test_update_extraction_conflict(fake_reports):
+    report_id = ObjectId()
+    fake_reports(found={"_id": report_id, "extracted_data": {}, "extraction_version": 1}, matched_count=0)
+
+    with pytest.raises(ValueError, match="Conflit"):
+        update_report_extraction_repository(str(report_id), {"nouveau": True}, 2)
+
+
+def test_update_extraction_missing_report(fake_reports):
+    reports = fake_reports(found=None)
+
+    with pytest.raises(ValueError, match="non trouvé"):
+        update_report_extraction_repository(str(ObjectId()), {}, 2)
+
+    assert calls_named(reports, "update_one") == []
@@ -0,0 +1,51 @@
+import pytest
+import requests
+
+pytest.importorskip("pymongo")
+pytest.importorskip("fastapi")
+pytest.importorskip("PyPDF2")
+
+from services import report_service
+
+
+class FakeResponse:
+    def __init__(self, status_code: int, payload: dict = None):
+        self.status_code = status_code
+        self.payload = payload or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(response=self)
+
+    def json(self):
+        return self.payload
+
+
+def test_request_mistral_uses_configured_timeout(monkeypatch):
+    calls = {}
+
+    def fake_post(url, json, timeout):
+        calls["timeout"] = timeout
+        return FakeResponse(200, {"response": "{}"})
+
+    monkeypatch.setattr(report_service.requests, "post", fake_post)
+
+    assert report_service.request_mistral_service("prompt") == "{}"
+    assert calls["timeout"] == report_service.settings.LLM_TIMEOUT_SECONDS
+
+
+def test_request_mistral_timeout_raises_value_error(monkeypatch):
+    def fake_post(url, json, timeout):
+        raise requests.Timeout("read timed out")
+
+    monkeypatch.setattr(report_service.requests, "post", fake_post)
+
+    with pytest.raises(ValueError, match="pas répondu à temps"):
+        report_service.request_mistral_service("prompt", timeout=1)
+
+
+def test_request_mistral_http_error_raises_value_error(monkeypatch):
+    monkeypatch.setattr(report_service.requests, "post", lambda url, json, timeout: FakeResponse(503))
+
+    with pytest.raises(ValueError, match="HTTP 503"):
+        report_service.request_mistral_service("prompt")